@@ -1,11 +1,62 @@
 import numpy as np
 import pandas as pd
-from typing import Optional, Union, List, Dict
+from typing import Optional, Union, List, Dict, TYPE_CHECKING
 
-from autogluon.timeseries import TimeSeriesDataFrame, TimeSeriesPredictor
+from Orange.data import Domain, ContinuousVariable
 from orangecontrib.timeseries import Timeseries
 
-def convert_to_autogluon_format(data: Timeseries) -> TimeSeriesDataFrame:
+# AutoGluon тянет за собой torch и другие тяжелые пакеты; импортируем его
+# только при первом использовании, чтобы не замедлять запуск Orange
+if TYPE_CHECKING:
+    from autogluon.timeseries import TimeSeriesDataFrame
+
+NS_PER_SECOND = 1_000_000_000
+
+def _sec_to_ns(seconds: np.ndarray) -> np.ndarray:
+    """
+    Convert epoch seconds (float, as stored by Orange) to datetime64[ns];
+    NaN becomes NaT
+    """
+    seconds = np.asarray(seconds, dtype=np.float64)
+    missing = np.isnan(seconds)
+    # Приведение NaN к int64 не определено, поэтому пропуски маскируем явно
+    ns = np.rint(np.where(missing, 0, seconds) * NS_PER_SECOND).astype(np.int64)
+    timestamps = ns.view('datetime64[ns]')
+    timestamps[missing] = np.datetime64('NaT')
+    return timestamps
+
+def _ns_to_sec(timestamps: np.ndarray) -> np.ndarray:
+    """
+    Convert datetime64 timestamps to epoch seconds as float64;
+    NaT becomes NaN
+    """
+    timestamps = np.asarray(timestamps, dtype='datetime64[ns]')
+    seconds = (timestamps.view(np.int64) // NS_PER_SECOND).astype(np.float64)
+    seconds[np.isnat(timestamps)] = np.nan
+    return seconds
+
+# (имена столбцов, id(time_var)) -> (time_var, Domain); ссылка на time_var
+# не дает его id достаться другой переменной, пока запись в кэше
+_domain_cache = {}
+_DOMAIN_CACHE_SIZE = 32
+
+def _build_domain(col_names: tuple, time_var) -> Domain:
+    """
+    Build (and cache) a forecast domain for the given columns and time variable
+    """
+    # Переменные Orange сравниваются по имени, а не по формату даты и
+    # часовому поясу, поэтому ключом служит сам объект переменной
+    key = (col_names, id(time_var))
+    if key in _domain_cache:
+        return _domain_cache[key][1]
+    
+    domain = Domain([ContinuousVariable(col) for col in col_names], metas=[time_var])
+    if len(_domain_cache) >= _DOMAIN_CACHE_SIZE:
+        del _domain_cache[next(iter(_domain_cache))]
+    _domain_cache[key] = (time_var, domain)
+    return domain
+
+def convert_to_autogluon_format(data: Timeseries) -> "TimeSeriesDataFrame":
     """
     Convert Orange Timeseries to AutoGluon TimeSeriesDataFrame
     
@@ -33,14 +84,21 @@ def convert_to_autogluon_format(data: Timeseries) -> TimeSeriesDataFrame:
     time_values = data.time_values
     target_values = data.Y
     
+    # ravel() возвращает представление, а не копию, для непрерывного Y
+    tv = target_values.ravel() if target_values.ndim > 1 else target_values
+    
     # Создаем DataFrame
     df = pd.DataFrame({
-        'timestamp': pd.to_datetime(time_values, unit='s'),
-        'target': target_values.flatten() if target_values.ndim > 1 else target_values,
-        'item_id': 'item_1'  # AutoGluon требует идентификатор временного ряда
+        'timestamp': _sec_to_ns(time_values),
+        'target': tv,
     })
+    # AutoGluon требует идентификатор временного ряда; храним его как
+    # категориальный столбец с одной категорией, чтобы не хешировать N строк
+    df['item_id'] = pd.Categorical.from_codes(
+        np.zeros(len(df), dtype=np.int8), categories=['item_1'])
     
     # Преобразуем в TimeSeriesDataFrame
+    from autogluon.timeseries import TimeSeriesDataFrame
     tsdf = TimeSeriesDataFrame.from_data_frame(
         df,
         id_column='item_id',
@@ -65,31 +123,19 @@ def convert_from_autogluon_forecast(forecast, original_data: Timeseries) -> Time
     Timeseries
         Orange Timeseries object with forecast
     """
-    from Orange.data import Domain, ContinuousVariable, TimeVariable
-    
     # Получаем временную переменную из исходных данных
     time_var = original_data.time_variable
     
-    # Преобразуем прогноз в DataFrame
-    forecast_df = forecast.reset_index()
-    
-    # Создаем новую временную шкалу для прогноза
-    last_timestamp = original_data.time_values[-1]
-    
     # Создаем домен с переменными
-    attrs = []
-    for col in forecast.columns:
-        if col != 'timestamp' and col != 'item_id':
-            attrs.append(ContinuousVariable(col))
+    domain = _build_domain(tuple(map(str, forecast.columns)), time_var)
     
-    domain = Domain(attrs, metas=[time_var])
-    
-    # Преобразуем данные для создания Timeseries
-    X = forecast_df[forecast.columns[2:]].values
+    # Преобразуем данные для создания Timeseries; item_id и timestamp
+    # находятся в индексе, поэтому все столбцы прогноза - значения
+    X = forecast.to_numpy(dtype=np.float64, copy=False)
     
     # Преобразуем timestamp в секунды с начала эпохи
-    timestamps = pd.to_datetime(forecast_df['timestamp']).astype(np.int64) // 10**9
-    metas = np.column_stack([timestamps])
+    timestamps = forecast.index.get_level_values('timestamp')
+    metas = _ns_to_sec(timestamps.to_numpy()).reshape(-1, 1)
     
     # Создаем Timeseries
     forecast_timeseries = Timeseries.from_numpy(domain, X, metas=metas)
@@ -106,6 +152,7 @@ class AutoGluonWrapper:
         self.kwargs = kwargs
         self.predictor = None
         self.data = None
+        self._ag_data = None
         
     def fit(self, data: Timeseries):
         """
@@ -118,7 +165,9 @@ class AutoGluonWrapper:
         """
         ag_data = convert_to_autogluon_format(data)
         self.data = data  # Сохраняем данные
+        self._ag_data = ag_data  # и их представление в формате AutoGluon
         
+        from autogluon.timeseries import TimeSeriesPredictor
         self.predictor = TimeSeriesPredictor(
             prediction_length=self.prediction_length,
             **self.kwargs
@@ -153,11 +202,20 @@ class AutoGluonWrapper:
             # Используем переданные данные
             data_to_use = data
             
-        ag_data = convert_to_autogluon_format(data_to_use)
+        ag_data = self._to_autogluon(data_to_use)
         predictions = self.predictor.predict(ag_data)
             
         return convert_from_autogluon_forecast(predictions, data_to_use)
     
+    def _to_autogluon(self, data: Timeseries) -> "TimeSeriesDataFrame":
+        """
+        Convert data to AutoGluon format, reusing the conversion made in fit
+        when the training data is passed again
+        """
+        if data is self.data and self._ag_data is not None:
+            return self._ag_data
+        return convert_to_autogluon_format(data)
+    
     def get_model(self, model_name):
         """
         Get a specific model from the predictor
@@ -199,11 +257,17 @@ class AutoGluonWrapper:
         if data is None:
             return None
         
-        ag_data = convert_to_autogluon_format(data)
+        # Для обучающих данных AutoGluon (>= 1.4) хранит прогнозы на
+        # валидационных окнах, полученные при обучении, - берем их из кэша
+        # вместо нового прогона модели
+        backtest = getattr(self.predictor, 'backtest_predictions', None)
+        if backtest is not None:
+            windows = backtest(None if data is self.data else self._to_autogluon(data))
+            return convert_from_autogluon_forecast(pd.concat(windows), data)
         
-        # В AutoGluon нет прямого способа получить fitted_values,
-        # но можно делать прогноз на историческом периоде
-        # Используем backtest для получения внутривыборочного прогноза
+        # В более старых версиях AutoGluon нет прямого способа получить
+        # fitted_values, поэтому делаем прогноз на историческом периоде
+        ag_data = self._to_autogluon(data)
         fitted_values = self.predictor.predict(ag_data)
         
         # Преобразуем прогнозы обратно в формат Orange Timeseries
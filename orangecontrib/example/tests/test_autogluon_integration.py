@@ -0,0 +1,56 @@
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from Orange.data import TimeVariable
+
+from orangecontrib.example.autogluon_integration import (
+    _sec_to_ns, _ns_to_sec, convert_from_autogluon_forecast
+)
+
+
+class TestTimestampConversion(unittest.TestCase):
+    def test_sec_to_ns(self):
+        ts = _sec_to_ns(np.array([0, 1.5, np.nan, 1_700_000_000]))
+        self.assertEqual(ts.dtype, np.dtype('datetime64[ns]'))
+        self.assertEqual(ts[0], np.datetime64(0, 'ns'))
+        self.assertEqual(ts[1], np.datetime64(1_500_000_000, 'ns'))
+        self.assertTrue(np.isnat(ts[2]))
+        self.assertEqual(ts[3], np.datetime64(1_700_000_000, 's'))
+
+    def test_ns_to_sec(self):
+        ts = np.array([0, 1_500_000_000, 'NaT'], dtype='datetime64[ns]')
+        sec = _ns_to_sec(ts)
+        self.assertEqual(sec.dtype, np.float64)
+        np.testing.assert_equal(sec, [0, 1, np.nan])
+
+    def test_round_trip(self):
+        sec = np.array([1_600_000_000, np.nan, 1_600_003_600])
+        np.testing.assert_equal(_ns_to_sec(_sec_to_ns(sec)), sec)
+
+
+class TestConvertFromAutoGluonForecast(unittest.TestCase):
+    def test_all_forecast_columns(self):
+        timestamps = pd.to_datetime([1_600_000_000, 1_600_003_600], unit='s')
+        index = pd.MultiIndex.from_product(
+            [['item_1'], timestamps], names=['item_id', 'timestamp'])
+        forecast = pd.DataFrame(
+            {'mean': [1., 2.], '0.1': [0.5, 1.5], '0.9': [1.5, 2.5]},
+            index=index)
+        time_var = TimeVariable("t", have_date=True, have_time=True)
+        original = SimpleNamespace(time_variable=time_var)
+
+        result = convert_from_autogluon_forecast(forecast, original)
+
+        self.assertEqual([var.name for var in result.domain.attributes],
+                         ['mean', '0.1', '0.9'])
+        self.assertIs(result.domain.metas[0], time_var)
+        np.testing.assert_equal(result.X, forecast.to_numpy())
+        np.testing.assert_equal(result.metas.ravel().astype(float),
+                                [1_600_000_000, 1_600_003_600])
+
+
+if __name__ == "__main__":
+    unittest.main()
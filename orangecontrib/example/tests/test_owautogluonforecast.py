@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import Mock, PropertyMock, patch
+
+from Orange.widgets.tests.base import WidgetTest
+
+from orangecontrib.example.widgets.owautogluonforecast import OWAutoGluonForecast
+
+
+class TestOWAutoGluonForecast(WidgetTest):
+    def setUp(self):
+        # Обучение не запускается: start() только помечает задачу как идущую,
+        # а ее завершение имитируется вызовом on_done/on_exception
+        task = patch.object(OWAutoGluonForecast, "task",
+                            new_callable=PropertyMock, return_value=None)
+        self.task = task.start()
+        self.addCleanup(task.stop)
+
+        self.paths = []
+        mkdtemp = tempfile.mkdtemp
+
+        def track_mkdtemp(**kwargs):
+            path = mkdtemp(**kwargs)
+            self.paths.append(path)
+            return path
+
+        patcher = patch("tempfile.mkdtemp", side_effect=track_mkdtemp)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(lambda: [shutil.rmtree(path, ignore_errors=True)
+                                 for path in self.paths])
+
+        self.widget = self.create_widget(OWAutoGluonForecast)
+        self.widget.start = Mock(
+            side_effect=lambda *args: setattr(self.task, "return_value", Mock()))
+        self.widget.data = Mock()
+
+    def request(self, prediction_length):
+        self.widget.prediction_length = prediction_length
+        self.widget.apply.now()
+
+    def finish(self):
+        predictor = Mock(kwargs={"path": self.widget._fit_path})
+        self.task.return_value = None
+        self.widget.on_done((predictor, None, None))
+        return predictor
+
+    def started_lengths(self):
+        return [call[0][3] for call in self.widget.start.call_args_list]
+
+    def output_predictor(self):
+        return self.get_output(self.widget.Outputs.predictor)
+
+    def test_queue_latest_request(self):
+        self.request(24)
+        self.request(25)
+        self.request(26)
+        self.assertEqual(self.started_lengths(), [24])
+
+        stale = self.finish()
+        self.assertIsNone(self.output_predictor())
+        self.assertEqual(self.started_lengths(), [24, 26])
+
+        current = self.finish()
+        self.assertIs(self.output_predictor(), current)
+        cached = [predictor for predictor, *_ in self.widget._fit_cache.values()]
+        self.assertEqual(cached, [stale, current])
+
+    def test_cache_hit_while_fitting(self):
+        self.request(24)
+        first = self.finish()
+        self.request(25)
+        self.request(24)
+        self.assertIs(self.output_predictor(), first)
+        self.assertEqual(self.started_lengths(), [24, 25])
+
+        self.finish()
+        self.assertIs(self.output_predictor(), first)
+        self.assertEqual(self.started_lengths(), [24, 25])
+        self.assertEqual(len(self.widget._fit_cache), 2)
+
+    def test_eviction_keeps_current_predictor(self):
+        self.widget.FIT_CACHE_SIZE = 2
+        self.request(24)
+        current = self.finish()
+
+        # Пока идет обучение, запросы меняются - результаты попадают в кэш
+        self.request(25)
+        self.request(26)
+        evicted = self.finish()
+        self.request(27)
+        self.finish()
+
+        cached = [predictor for predictor, *_ in self.widget._fit_cache.values()]
+        self.assertIn(current, cached)
+        self.assertNotIn(evicted, cached)
+        self.assertLessEqual(len(cached), 2)
+        self.assertFalse(os.path.exists(evicted.kwargs["path"]))
+        self.assertTrue(os.path.exists(current.kwargs["path"]))
+
+    def test_failed_fit_removes_directory(self):
+        self.request(24)
+        path = self.widget._fit_path
+        self.assertTrue(os.path.exists(path))
+
+        self.task.return_value = None
+        self.widget.on_exception(ValueError("boom"))
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(self.widget.Error.fitting_failed.is_shown())
+        self.assertIsNone(self.output_predictor())
+
+    def test_no_data(self):
+        self.request(24)
+        self.widget.data = None
+        self.widget.apply.now()
+        self.finish()
+        self.assertIsNone(self.output_predictor())
+        self.assertEqual(self.started_lengths(), [24])
+
+
+if __name__ == "__main__":
+    unittest.main()
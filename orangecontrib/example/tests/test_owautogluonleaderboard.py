@@ -0,0 +1,134 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import numpy as np
+import pandas as pd
+
+from AnyQt.QtCore import Qt, QPersistentModelIndex
+
+from Orange.widgets.tests.base import GuiTest, WidgetTest
+
+from orangecontrib.example.widgets.owautogluonleaderboard import (
+    LeaderboardModel, OWAutoGluonLeaderboard, compute_leaderboard, sort_order
+)
+
+
+class TestComputeLeaderboard(unittest.TestCase):
+    def test_missing_columns(self):
+        # AutoGluon не вернул pred_time_val и часть значений
+        leaderboard = pd.DataFrame({
+            "model": ["A", "B"],
+            "score_val": [-1., np.nan],
+            "fit_time": [2., np.nan],
+        })
+        predictor = SimpleNamespace(
+            predictor=SimpleNamespace(leaderboard=lambda *args: leaderboard))
+
+        models, nums, ag_test_data = compute_leaderboard(
+            predictor, None, None, Mock())
+
+        np.testing.assert_equal(models, ["A", "B"])
+        self.assertEqual(models.dtype, object)
+        np.testing.assert_equal(nums, [[-1., 2., 0.], [np.nan, 0., 0.]])
+        self.assertIsNone(ag_test_data)
+
+    def test_test_data_uses_score_test(self):
+        leaderboard = pd.DataFrame({
+            "model": ["A"], "score_test": [-3.], "score_val": [-1.],
+            "fit_time": [2.], "pred_time_val": [0.5],
+        })
+        ag_data = object()
+        calls = []
+
+        def get_leaderboard(*args):
+            calls.append(args)
+            return leaderboard
+
+        predictor = SimpleNamespace(
+            predictor=SimpleNamespace(leaderboard=get_leaderboard))
+        models, nums, ag_test_data = compute_leaderboard(
+            predictor, Mock(), ag_data, Mock())
+
+        self.assertEqual(calls, [(ag_data,)])
+        self.assertIs(ag_test_data, ag_data)
+        np.testing.assert_equal(nums, [[-3., 2., 0.5]])
+
+
+class TestSortOrder(unittest.TestCase):
+    def setUp(self):
+        self.models = np.array(["b", "a", "c"], dtype=object)
+        self.nums = np.array([[2., 1., 0.], [1., 3., 0.], [2., 2., 0.]])
+
+    def test_by_name(self):
+        np.testing.assert_equal(
+            sort_order(self.models, self.nums, 0, Qt.AscendingOrder), [1, 0, 2])
+        np.testing.assert_equal(
+            sort_order(self.models, self.nums, 0, Qt.DescendingOrder), [2, 0, 1])
+
+    def test_by_number_is_stable(self):
+        np.testing.assert_equal(
+            sort_order(self.models, self.nums, 1, Qt.AscendingOrder), [1, 0, 2])
+        np.testing.assert_equal(
+            sort_order(self.models, self.nums, 2, Qt.DescendingOrder), [1, 2, 0])
+
+
+class TestLeaderboardModel(GuiTest):
+    def setUp(self):
+        self.model = LeaderboardModel()
+        self.model.set_data(np.array(["b", "a", "c"], dtype=object),
+                            np.array([[2., 1., 0.], [1., 3., 0.], [3., 2., 0.]]))
+
+    def test_data(self):
+        self.assertEqual(self.model.rowCount(), 3)
+        self.assertEqual(self.model.columnCount(), 4)
+        self.assertEqual(self.model.index(0, 0).data(), "b")
+        self.assertEqual(self.model.index(1, 1).data(), "1")
+        self.assertEqual(self.model.model_name(2), "c")
+
+    def test_sort_remaps_persistent_indexes(self):
+        persistent = QPersistentModelIndex(self.model.index(0, 2))
+        self.model.sort(0, Qt.AscendingOrder)
+        self.assertEqual([self.model.model_name(i) for i in range(3)],
+                         ["a", "b", "c"])
+        self.assertEqual(persistent.row(), 1)
+        self.assertEqual(persistent.column(), 2)
+
+        self.model.sort(1, Qt.DescendingOrder)
+        self.assertEqual([self.model.model_name(i) for i in range(3)],
+                         ["c", "b", "a"])
+        self.assertEqual(persistent.row(), 1)
+        self.assertEqual(self.model.index(0, 1).data(), "3")
+
+    def test_clear(self):
+        self.model.clear()
+        self.assertEqual(self.model.rowCount(), 0)
+
+
+
+class TestOWAutoGluonLeaderboard(WidgetTest):
+    def setUp(self):
+        self.widget = self.create_widget(OWAutoGluonLeaderboard)
+
+    def test_reselect_after_failed_lookup(self):
+        def get_model(name):
+            if name == "B":
+                raise KeyError(name)
+            return "model " + name
+
+        self.widget.predictor = Mock(get_model=Mock(side_effect=get_model))
+        self.widget.model.set_data(np.array(["A", "B"], dtype=object),
+                                   np.zeros((2, 3)))
+        output = self.widget.Outputs.selected_model
+
+        self.widget.table.selectRow(0)
+        self.assertEqual(self.get_output(output), "model A")
+        self.widget.table.selectRow(1)
+        self.assertIsNone(self.get_output(output))
+        self.assertTrue(self.widget.Error.evaluation_failed.is_shown())
+        self.widget.table.selectRow(0)
+        self.assertEqual(self.get_output(output), "model A")
+
+
+if __name__ == "__main__":
+    unittest.main()
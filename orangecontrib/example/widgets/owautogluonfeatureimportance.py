@@ -1,3 +1,5 @@
+import numpy as np
+
 from AnyQt.QtCore import Qt
 from AnyQt.QtWidgets import QFormLayout, QComboBox
 
@@ -125,10 +127,9 @@ class OWAutoGluonFeatureImportance(OWScatterPlotBase):
                 [StringVariable("Feature")]
             )
             
-            metas = [[feature] for feature in importance.index]
-            X = [[importance.loc[feature, 'importance'], 
-                  importance.loc[feature, 'stddev']] 
-                 for feature in importance.index]
+            X = importance[['importance', 'stddev']].to_numpy(
+                dtype=np.float64, copy=False)
+            metas = importance.index.to_numpy().reshape(-1, 1)
             
             self.importance_data = Table.from_numpy(domain, X, None, metas)
             self.Outputs.feature_importance.send(self.importance_data)
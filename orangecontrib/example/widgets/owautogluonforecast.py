@@ -1,13 +1,44 @@
+import shutil
+import tempfile
+
 from AnyQt.QtCore import Qt
 from AnyQt.QtWidgets import QFormLayout
 
 from Orange.widgets import widget, gui, settings
 from Orange.widgets.widget import Input, Output, Msg
+from Orange.widgets.utils.concurrent import ConcurrentWidgetMixin, TaskState
 
 from orangecontrib.timeseries import Timeseries
 from orangecontrib.example.autogluon_integration import AutoGluonWrapper, convert_to_autogluon_format
 
-class OWAutoGluonForecast(widget.OWWidget):
+def run(data, path, prediction_length, eval_metric, preset, time_limit,
+        state: TaskState):
+    """
+    Fit AutoGluon on data and compute forecast and fitted values
+    
+    Returns
+    -------
+    tuple
+        (AutoGluonWrapper, forecast, fitted values)
+    """
+    state.set_status("Fitting models...")
+    predictor = AutoGluonWrapper(
+        prediction_length=prediction_length,
+        eval_metric=eval_metric,
+        path=path,
+        presets=preset,
+        time_limit=time_limit
+    )
+    predictor.fit(data)
+    
+    # Генерируем прогноз и внутривыборочные значения один раз,
+    # результат сохраняется в кэше виджета вместе с моделью
+    state.set_status("Forecasting...")
+    state.set_progress_value(80)
+    return predictor, predictor.predict(data), predictor.get_fitted_values(data)
+
+
+class OWAutoGluonForecast(widget.OWWidget, ConcurrentWidgetMixin):
     name = "AutoGluon Forecast"
     description = "Automatic time series forecasting with AutoGluon"
     icon = "icons/AutoGluonForecast.svg"
@@ -36,13 +67,25 @@ class OWAutoGluonForecast(widget.OWWidget):
     time_limit = settings.Setting(600)
     autocommit = settings.Setting(True)
     
+    # Сколько обученных моделей хранить для быстрого возврата к настройкам
+    FIT_CACHE_SIZE = 3
+    
     METRICS = ["MASE", "RMSE", "MAE", "MAPE", "SMAPE", "WAPE"]
     PRESETS = ["fast_training", "medium_quality", "high_quality", "best_quality"]
     
     def __init__(self):
         super().__init__()
+        ConcurrentWidgetMixin.__init__(self)
         self.data = None
         self.predictor = None
+        self._fit_key = None
+        self._fit_path = None
+        # Последние запрошенные ключ и аргументы обучения
+        self._requested_key = None
+        self._requested_args = None
+        # Обученные модели и их результаты по ключу (данные, настройки);
+        # каждая модель хранится в собственном временном каталоге
+        self._fit_cache = {}
         
         # UI setup
         box = gui.vBox(self.controlArea, "Forecast Settings")
@@ -85,7 +128,10 @@ class OWAutoGluonForecast(widget.OWWidget):
         
         self.data = None
         if data is not None:
-            self.data = Timeseries.from_data_table(data)
+            # from_data_table ищет временную переменную в домене, поэтому
+            # пропускаем его, только если она уже задана
+            self.data = data if getattr(data, 'time_variable', None) is not None \
+                else Timeseries.from_data_table(data)
             
             if not self.data.time_variable:
                 self.Error.no_time_variable()
@@ -105,73 +151,102 @@ class OWAutoGluonForecast(widget.OWWidget):
         self.Error.clear()
         
         if self.data is None:
-            self.Outputs.forecast.send(None)
-            self.Outputs.predictor.send(None)
-            self.Outputs.fitted_values.send(None)
+            self._requested_key = None
+            self._send_outputs(None, None, None)
             return
         
-        try:
-            # Создаем и обучаем модель
-            self.predictor = AutoGluonWrapper(
-                prediction_length=self.prediction_length,
-                eval_metric=self.eval_metric,
-                path="autogluon-timeseries-model",
-                presets=self.preset,
-                time_limit=self.time_limit
-            )
-            
-            with self.progressBar(1) as progress:
-                self.predictor.fit(self.data)
-                progress.advance()
-                
-                # Генерируем прогноз
-                forecast = self.predictor.predict(self.data)
-                fitted_values = self.predictor.get_fitted_values(self.data)
-                
-                self.Outputs.forecast.send(forecast)
-                self.Outputs.predictor.send(self.predictor)
-                self.Outputs.fitted_values.send(fitted_values)
-                
-        except Exception as e:
-            self.Error.fitting_failed(str(e))
-            self.Outputs.forecast.send(None)
-            self.Outputs.predictor.send(None)
-            self.Outputs.fitted_values.send(None)
+        key = (id(self.data), self.prediction_length, self.eval_metric,
+               self.preset, self.time_limit)
+        self._requested_key = key
+        self._requested_args = (self.data, self.prediction_length, self.eval_metric,
+                                self.preset, self.time_limit)
+        # Уже обученные настройки отдаем сразу, даже если идет другое обучение
+        if key in self._fit_cache:
+            self._show_fit(key, self._fit_cache[key])
+            return
+        
+        # Обучение AutoGluon нельзя прервать, поэтому новое не запускаем, пока
+        # идет текущее: последние запрошенные настройки обучаются после него
+        if self.task is None:
+            self._start_requested()
     
-    def commit(self):
-        """Выполнить прогнозирование и передать результаты."""
-        if self.data is None:
-            self.Outputs.forecast.send(None)
+    def _start_requested(self):
+        # Запрошенный результат из кэша уже был отправлен в apply
+        if self._requested_key is None or self._requested_key in self._fit_cache:
             return
         
-        try:
-            # Создаем и обучаем модель прогнозирования
-            self.predictor = AutoGluonWrapper(
-                prediction_length=self.prediction_length,
-                eval_metric=self.eval_metric,
-                path="autogluon-timeseries-model",
-                presets=self.preset,
-                time_limit=self.time_limit
-            )
-            
-            self.predictor.fit(self.data)
-            
-            # Делаем прогноз
-            forecast_data = self.predictor.predict(self.data)
-            
-            # Отправляем результат
-            self.Outputs.forecast.send(forecast_data)
-            self.Outputs.predictor.send(self.predictor)
-            
-            # Получаем fitted values
-            fitted_values = self.predictor.get_fitted_values(self.data)
-            self.Outputs.fitted_values.send(fitted_values)
-            
-        except Exception as e:
-            self.Error.fitting_failed(str(e))
-            self.Outputs.forecast.send(None)
-            self.Outputs.predictor.send(None)
-            self.Outputs.fitted_values.send(None)
+        # Обучение AutoGluon может занимать до time_limit секунд, поэтому
+        # выполняем его в отдельном потоке, не блокируя интерфейс.
+        # Каждое обучение пишет модели в свой каталог, чтобы не затереть
+        # файлы предикторов, уже отправленных на выход или лежащих в кэше
+        self._fit_key = self._requested_key
+        data, *settings = self._requested_args
+        self._fit_path = tempfile.mkdtemp(prefix="autogluon-timeseries-")
+        self.start(run, data, self._fit_path, *settings)
+    
+    def on_done(self, result):
+        if self._fit_key != self._requested_key:
+            # Пока шло обучение, настройки или данные изменились
+            self._cache_fit(self._fit_key, result)
+            self._start_requested()
+            return
+        
+        self._show_fit(self._fit_key, result)
+    
+    def _show_fit(self, key, result):
+        self.predictor, forecast, fitted_values = result
+        self._cache_fit(key, result)
+        self._send_outputs(forecast, self.predictor, fitted_values)
+    
+    def on_exception(self, ex):
+        shutil.rmtree(self._fit_path, ignore_errors=True)
+        if self._fit_key != self._requested_key:
+            self._start_requested()
+            return
+        
+        self.Error.fitting_failed(str(ex))
+        self._send_outputs(None, None, None)
+    
+    def _cache_fit(self, key, result):
+        # Последняя использованная запись - в конце словаря
+        self._fit_cache.pop(key, None)
+        self._fit_cache[key] = result
+        while len(self._fit_cache) > self.FIT_CACHE_SIZE:
+            # Вытесняем самую старую модель, кроме текущей на выходе
+            old_key = next(k for k, (predictor, *_) in self._fit_cache.items()
+                           if predictor is not self.predictor)
+            self._remove_fit(self._fit_cache.pop(old_key)[0])
+    
+    @staticmethod
+    def _remove_fit(predictor):
+        shutil.rmtree(predictor.kwargs["path"], ignore_errors=True)
+    
+    def on_partial_result(self, result):
+        pass
+    
+    def onDeleteWidget(self):
+        if self.task is not None:
+            # После shutdown() on_done/on_exception уже не вызываются, поэтому
+            # каталог идущего обучения удаляем, когда оно завершится
+            path = self._fit_path
+            self.task.future.add_done_callback(
+                lambda _: shutil.rmtree(path, ignore_errors=True))
+        self.shutdown()
+        for predictor, *_ in self._fit_cache.values():
+            self._remove_fit(predictor)
+        self._fit_cache.clear()
+        super().onDeleteWidget()
+    
+    def _send_outputs(self, forecast, predictor, fitted_values):
+        # Сигналы, отправленные в одном обработчике, Orange передает
+        # дальше одним обновлением схемы после возврата из него
+        self.Outputs.forecast.send(forecast)
+        self.Outputs.predictor.send(predictor)
+        self.Outputs.fitted_values.send(fitted_values)
+    
+    def commit(self):
+        """Выполнить прогнозирование и передать результаты."""
+        self.apply.now()
 
 
 if __name__ == "__main__":
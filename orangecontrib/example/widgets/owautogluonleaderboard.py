@@ -1,14 +1,124 @@
-from AnyQt.QtCore import Qt
+import numpy as np
+
+from AnyQt.QtCore import Qt, QAbstractTableModel, QModelIndex
 from AnyQt.QtWidgets import QTableView, QHeaderView
 
 from Orange.data import Table, Domain, ContinuousVariable, StringVariable
 from Orange.widgets import gui, settings
 from Orange.widgets.widget import Input, Output, Msg, OWWidget
-from Orange.widgets.utils.itemmodels import PyTableModel
+from Orange.widgets.utils.concurrent import ConcurrentWidgetMixin, TaskState
 
 from orangecontrib.timeseries import Timeseries
+from orangecontrib.example.autogluon_integration import convert_to_autogluon_format
+
+def compute_leaderboard(predictor, test_data, ag_test_data, state: TaskState):
+    """
+    Evaluate predictor models and extract the displayed leaderboard columns;
+    test_data is converted to AutoGluon format unless ag_test_data is given
+    
+    Returns
+    -------
+    tuple
+        (model names as object array, [score, fit time, inference time] array,
+         test data in AutoGluon format or None)
+    """
+    if test_data is not None and ag_test_data is None:
+        state.set_status("Converting test data...")
+        ag_test_data = convert_to_autogluon_format(test_data)
+        
+    state.set_status("Evaluating models...")
+    if ag_test_data is not None:
+        # Оцениваем на тестовых данных
+        leaderboard = predictor.predictor.leaderboard(ag_test_data)
+        score_col = 'score_test'
+    else:
+        # Используем встроенную таблицу лидеров
+        leaderboard = predictor.predictor.leaderboard()
+        score_col = 'score_val'
+        
+    # AutoGluon может не возвращать время для некоторых моделей;
+    # пропуски во времени считаем нулями, пропущенная оценка остается NaN
+    lb = leaderboard.reindex(columns=['model', score_col, 'fit_time', 'pred_time_val'])
+    lb[['fit_time', 'pred_time_val']] = lb[['fit_time', 'pred_time_val']].fillna(0)
+    models = lb['model'].to_numpy(dtype=object)
+    nums = lb[[score_col, 'fit_time', 'pred_time_val']].to_numpy(dtype=float)
+    return models, nums, ag_test_data
+
+
+def sort_order(models, nums, column, order):
+    """
+    Return the row permutation that sorts the leaderboard by column
+    (0 - model name, 1..3 - numeric columns)
+    """
+    key = nums[:, column - 1] if column >= 1 else models
+    idx = np.argsort(key, kind='stable')
+    if order == Qt.DescendingOrder:
+        idx = idx[::-1]
+    return idx
 
-class OWAutoGluonLeaderboard(OWWidget):
+
+class LeaderboardModel(QAbstractTableModel):
+    """
+    Table model that keeps the leaderboard in two numpy arrays:
+    model names (object) and score/fit time/inference time (float64)
+    """
+    HEADERS = ["Model", "Score", "Fit Time", "Inference Time"]
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._models = np.empty(0, dtype=object)
+        self._nums = np.empty((0, 3), dtype=np.float64)
+        
+    def set_data(self, models, nums):
+        self.beginResetModel()
+        # Храним столбцы раздельно: имена - массив объектов, числа - непрерывный
+        # float64, чтобы сортировка и отображение не работали с ячейками-объектами
+        self._models = np.asarray(models, dtype=object)
+        self._nums = np.ascontiguousarray(nums, dtype=np.float64).reshape(-1, 3)
+        self.endResetModel()
+        
+    def model_name(self, row):
+        """Return the model name (not its display text) in the given row"""
+        return self._models[row]
+        
+    def clear(self):
+        self.set_data(np.empty(0, dtype=object), np.empty((0, 3), dtype=np.float64))
+        
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._models)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+    
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        row, column = index.row(), index.column()
+        if column == 0:
+            return str(self._models[row])
+        return "%.4g" % self._nums[row, column - 1]
+    
+    def sort(self, column, order=Qt.AscendingOrder):
+        idx = sort_order(self._models, self._nums, column, order)
+            
+        # Меняем только порядок строк, поэтому достаточно layoutChanged
+        self.layoutAboutToBeChanged.emit()
+        self._models, self._nums = self._models[idx], self._nums[idx]
+        new_rows = np.empty_like(idx)
+        new_rows[idx] = np.arange(len(idx))
+        old_indexes = self.persistentIndexList()
+        self.changePersistentIndexList(
+            old_indexes,
+            [self.index(int(new_rows[i.row()]), i.column()) for i in old_indexes])
+        self.layoutChanged.emit()
+
+
+class OWAutoGluonLeaderboard(OWWidget, ConcurrentWidgetMixin):
     name = "AutoGluon Leaderboard"
     description = "Display model leaderboard for AutoGluon TimeSeries"
     icon = "icons/AutoGluonLeaderboard.svg"
@@ -26,24 +136,51 @@ class OWAutoGluonLeaderboard(OWWidget):
         invalid_predictor = Msg("Input is not a valid AutoGluon predictor")
         evaluation_failed = Msg("Evaluation failed: {}")
     
+    # Сколько таблиц лидеров (для разных тестовых данных) хранить в кэше
+    LB_CACHE_SIZE = 3
+    
     # Settings
     sorting = settings.Setting((0, Qt.AscendingOrder))
     selected_model = settings.Setting(None)
     
     def __init__(self):
         super().__init__()
+        ConcurrentWidgetMixin.__init__(self)
         
         self.predictor = None
         self.test_data = None
+        self._ag_test_data = None
+        # Извлеченные столбцы таблицы лидеров по (предиктор, тестовые данные)
+        self._lb_cache = {}
+        self._lb_pending = None
+        # Ключ таблицы, которую нужно показать сейчас (None - нечего показывать)
+        self._lb_requested = None
+        # Последняя отправленная модель и полученные модели текущего предиктора
+        self._last_selected = None
+        self._model_obj_cache = {}
+        
+        # Домен выходной таблицы не зависит от данных
+        self._domain = Domain(
+            [ContinuousVariable("Score"), 
+             ContinuousVariable("Fit Time"),
+             ContinuousVariable("Inference Time")],
+            [],
+            [StringVariable("Model")]
+        )
         
         # Создаем таблицу
         self.table = QTableView()
-        self.model = PyTableModel(parent=self.table)
-        
-        self.model.setHorizontalHeaderLabels(["Model", "Score", "Fit Time", "Inference Time"])
+        self.model = LeaderboardModel(parent=self.table)
         
         self.table.setModel(self.model)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        # Фиксированная высота строк: представлению не нужно запрашивать
+        # размер каждой строки у модели при прокрутке и перерисовке
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(
+            self.table.fontMetrics().height() + 4)
+        self.table.setHorizontalScrollMode(QTableView.ScrollPerPixel)
+        self.table.setVerticalScrollMode(QTableView.ScrollPerPixel)
         self.table.horizontalHeader().sectionClicked.connect(self.sort_by_column)
         self.table.setSelectionBehavior(QTableView.SelectRows)
         self.table.setSelectionMode(QTableView.SingleSelection)
@@ -56,6 +193,9 @@ class OWAutoGluonLeaderboard(OWWidget):
     def set_predictor(self, predictor):
         self.Error.clear()
         self.predictor = predictor
+        self._lb_cache.clear()
+        self._last_selected = None
+        self._model_obj_cache.clear()
         
         if predictor is None:
             self.model.clear()
@@ -63,75 +203,90 @@ class OWAutoGluonLeaderboard(OWWidget):
             self.Outputs.evaluation_results.send(None)
             return
         
-        try:
-            # Проверяем, что это действительно AutoGluon предиктор
-            if not hasattr(predictor, 'predictor') or not hasattr(predictor.predictor, 'leaderboard'):
-                self.Error.invalid_predictor()
-                self.predictor = None
-                return
-                
-            self.update_leaderboard()
-            
-        except Exception as e:
+        # Проверяем, что это действительно AutoGluon предиктор
+        if not hasattr(predictor, 'predictor') or not hasattr(predictor.predictor, 'leaderboard'):
             self.Error.invalid_predictor()
             self.predictor = None
     
     @Inputs.time_series
     def set_data(self, data):
         self.test_data = data
-        if self.predictor is not None:
-            self.update_leaderboard()
+        # Преобразованные данные сохраняются после первой оценки в потоке
+        self._ag_test_data = None
+    
+    def handleNewSignals(self):
+        # Вызывается один раз после получения всех новых входов, поэтому
+        # одновременная смена предиктора и данных пересчитывает таблицу один раз
+        self.update_leaderboard()
     
     def update_leaderboard(self):
+        # cancel() ждал бы завершения leaderboard(), который нельзя прервать;
+        # вместо этого устаревшие результаты отбрасываются в on_done
+        self.Error.evaluation_failed.clear()
         if self.predictor is None:
+            self._lb_requested = None
             return
             
-        try:
-            # Получаем таблицу лидеров
-            if self.test_data is not None:
-                # Оцениваем на тестовых данных
-                from orangecontrib.example.autogluon_integration import convert_to_autogluon_format
-                ag_data = convert_to_autogluon_format(self.test_data)
-                leaderboard = self.predictor.predictor.leaderboard(ag_data)
-            else:
-                # Используем встроенную таблицу лидеров
-                leaderboard = self.predictor.predictor.leaderboard()
-                
-            # Заполняем модель
-            self.model.clear()
-            rows = []
-            
-            for _, row in leaderboard.iterrows():
-                rows.append([
-                    row['model'],
-                    row['score_test' if self.test_data is not None else 'score_val'],
-                    row.get('fit_time', 0),
-                    row.get('pred_time_val', 0)
-                ])
-                
-            self.model.wrap(rows)
-            
-            # Восстанавливаем сортировку
-            self.sort_by_column(*self.sorting)
-            
-            # Создаем таблицу Orange для вывода
-            domain = Domain(
-                [ContinuousVariable("Score"), 
-                 ContinuousVariable("Fit Time"),
-                 ContinuousVariable("Inference Time")],
-                [],
-                [StringVariable("Model")]
-            )
-            
-            metas = [[row[0]] for row in rows]
-            X = [[row[1], row[2], row[3]] for row in rows]
-            
-            results_table = Table.from_numpy(domain, X, None, metas)
-            self.Outputs.evaluation_results.send(results_table)
-            
-        except Exception as e:
-            self.Error.evaluation_failed(str(e))
+        key = self._lb_requested = (id(self.predictor), id(self.test_data))
+        if key in self._lb_cache:
+            _, models, nums = self._lb_cache[key]
+            self._show_leaderboard(models, nums)
+            return
             
+        # Оценка моделей AutoGluon может занимать секунды и минуты,
+        # поэтому выполняем ее в отдельном потоке; start() отменяет
+        # предыдущую задачу, не дожидаясь ее
+        self._lb_pending = (key, self.test_data)
+        self.start(compute_leaderboard, self.predictor, self.test_data, self._ag_test_data)
+        
+    def on_done(self, result):
+        key, test_data = self._lb_pending
+        models, nums, ag_test_data = result
+        if test_data is self.test_data:
+            self._ag_test_data = ag_test_data
+        if self.predictor is None or key[0] != id(self.predictor):
+            # Результат для предиктора, которого уже нет на входе
+            return
+        # Храним ссылку на тестовые данные, чтобы их id не был
+        # переиспользован другим объектом, пока запись в кэше
+        self._lb_cache[key] = (test_data, models, nums)
+        while len(self._lb_cache) > self.LB_CACHE_SIZE:
+            del self._lb_cache[next(iter(self._lb_cache))]
+        if key == self._lb_requested:
+            self._show_leaderboard(models, nums)
+        
+    def on_exception(self, ex):
+        if self._lb_pending[0] != self._lb_requested:
+            return
+        # Не показываем оценки на валидации вместо неудавшейся оценки на тесте
+        self.Error.evaluation_failed(str(ex))
+        self.model.clear()
+        self.Outputs.evaluation_results.send(None)
+        
+    def on_partial_result(self, result):
+        pass
+        
+    def onDeleteWidget(self):
+        self.shutdown()
+        super().onDeleteWidget()
+        
+    def _show_leaderboard(self, models, nums):
+        # Сортируем массивы заранее, вместо сортировки строк в модели
+        column, order = self.sorting
+        idx = sort_order(models, nums, column, order)
+        models, nums = models[idx], nums[idx]
+        
+        self.model.set_data(models, nums)
+        
+        # Восстанавливаем индикатор сортировки
+        self.table.horizontalHeader().setSortIndicator(column, order)
+        
+        # Создаем таблицу Orange для вывода; после индексирования nums -
+        # новый непрерывный массив float64, который Table принимает без копии
+        metas = models.reshape(-1, 1)
+        results_table = Table.from_numpy(self._domain, nums, None, metas)
+        self.Outputs.evaluation_results.send(results_table)
+        
     def sort_by_column(self, column, order=None):
         if order is None:
             order = Qt.AscendingOrder if self.sorting[1] == Qt.DescendingOrder else Qt.DescendingOrder
@@ -142,21 +297,29 @@ class OWAutoGluonLeaderboard(OWWidget):
     def selection_changed(self):
         indexes = self.table.selectionModel().selectedRows()
         if not indexes:
+            self._last_selected = None
             self.Outputs.selected_model.send(None)
             return
             
-        model_name = self.model[indexes[0].row()][0]
+        model_name = self.model.model_name(indexes[0].row())
         self.selected_model = model_name
         
+        # Выбор той же строки может прийти несколько раз - модель уже отправлена
+        if model_name == self._last_selected:
+            return
+        
         if self.predictor is not None:
             # Получаем выбранную модель
             try:
-                selected_model = self.predictor.get_model(model_name)
-                self.Outputs.selected_model.send(selected_model)
-            except:
+                if model_name not in self._model_obj_cache:
+                    self._model_obj_cache[model_name] = self.predictor.get_model(model_name)
+                self.Outputs.selected_model.send(self._model_obj_cache[model_name])
+                self._last_selected = model_name
+            except Exception:
                 self.Error.evaluation_failed(f"Could not access model {model_name}")
+                self._last_selected = None
                 self.Outputs.selected_model.send(None)
-            
+
 
 if __name__ == "__main__":
     from orangewidget.utils.widgetpreview import WidgetPreview